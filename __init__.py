@@ -1,13 +1,27 @@
 #!/usr/bin/env python
 # vim: set list et ts=8 sts=4 sw=4 ft=python:
 
-from . import ascii
-from . import c
-from . import cpdict
-from . import dt
-from . import iter
-from . import hexdump
-from . import pb
-from . import retry
-from . import xor
+# Submodules are imported lazily on first attribute access, such that
+# `import haklib` stays cheap for tools that only use one of them.
+# Run `python -m haklib` to check the cold-start cost of `import haklib`.
 
+__all__ = [
+    'ascii',
+    'c',
+    'cpdict',
+    'dt',
+    'iter',
+    'hexdump',
+    'pb',
+    'retry',
+    'xor',
+]
+
+def __getattr__(name):
+    if name in __all__:
+        __import__('%s.%s' % (__name__, name))
+        return globals()[name]
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# vim: set list et ts=8 sts=4 sw=4 ft=python:
+
+# haklib.__main__ - import-time check for the haklib package
+# Copyright (C) 2019, Daniel Roethlisberger <daniel@roe.ch>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions, and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+# NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Usage:
+#
+# python -m haklib [module ...]
+#
+# Imports haklib and then each given submodule in a fresh interpreter with
+# -X importtime and prints the cumulative import time of each.  Exits with
+# status 1 if a plain `import haklib` pulls in any submodule or any of the
+# standard library modules the submodules depend on, not counting modules
+# that the interpreter already loads at startup.
+
+import os
+import subprocess
+import sys
+
+# Modules that a plain `import haklib` must not import.
+HEAVY = ['binascii', 'collections', 'concurrent.futures', 'datetime',
+         'itertools', 're', 'struct', 'subprocess']
+
+def importtime(stmt):
+    """
+    Run *stmt* in a fresh interpreter with -X importtime and return the list
+    of (module, cumulative microseconds) tuples for top-level imports, as
+    well as the list of modules loaded after running *stmt*.  Imports done
+    during interpreter startup are included in the list of times.
+    """
+    path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = "%s\nimport sys\nprint('\\n'.join(sys.modules))" % stmt
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                          cwd=path, stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE, universal_newlines=True,
+                          check=True)
+    times = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        try:
+            cumulative = int(fields[1])
+        except ValueError:
+            continue
+        name = fields[2].rstrip()
+        if not name.startswith('  '):
+            times.append((name.strip(), cumulative))
+    return times, proc.stdout.split()
+
+def ownimporttime(package, times):
+    """
+    Return the sum of cumulative import times of *package* and its
+    submodules from *times* as returned by importtime().
+    """
+    return sum(us for name, us in times
+               if name == package or name.startswith(package + '.'))
+
+def main(args):
+    package = __package__ or 'haklib'
+    times, modules = importtime('import %s' % package)
+    # modules already loaded at interpreter startup, e.g. by site or .pth
+    # hooks, are not haklib's doing
+    _, startup = importtime('pass')
+    status = 0
+    print('%-24s %8i us' % (package, ownimporttime(package, times)))
+    for name in sorted(set(modules) - set(startup)):
+        if name.startswith(package + '.') or name in HEAVY:
+            print('error: import %s imports %s' % (package, name))
+            status = 1
+    for arg in args:
+        times, _ = importtime('import %s.%s' % (package, arg))
+        print('%-24s %8i us' % ('%s.%s' % (package, arg),
+                                ownimporttime(package, times)))
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -24,30 +24,137 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
 # THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
-def asciibox(msg, title=None, minwidth=None):
+import io
+
+def _lines(msg):
     """
-    Returns message string *msg* wrapped in a plain ASCII box.
-    If *width* is given, pad the lines to *width* characters.
+    Return *msg* as a sequence of lines that can be iterated over twice.
+    *msg* is either a string or an iterable of lines.
+    """
+    if isinstance(msg, str):
+        return msg.splitlines()
+    if iter(msg) is msg:
+        return list(msg)
+    return msg
+
+def asciibox_write(f, msg, title=None, minwidth=None, width=None):
+    """
+    Write message *msg* wrapped in a plain ASCII box to file object *f*.
+    *msg* is either a string or an iterable of lines without line endings.
+    If *minwidth* is given, pad the lines to at least *minwidth* characters.
+    If *width* is given, pad the lines to *width* characters and stream
+    *msg* to *f* in a single pass instead of measuring it first; longer lines
+    are written as they are.  *minwidth* and *title* still widen the box.
     If *title* is given, add *title* in the top horizontal bar.
     """
-    out = []
-    lines = msg.splitlines()
-    width = 0
-    for line in lines:
-        width = max(width, len(line))
-    if minwidth != None:
+    if width is None:
+        msg = _lines(msg)
+        width = max(map(len, msg), default=0)
+    elif isinstance(msg, str):
+        msg = msg.splitlines()
+    if minwidth is not None:
         width = max(width, minwidth)
-    if title != None:
+    if title is not None:
         width = max(width, len(title) + 6)
-    ftr = "+" + ("-" * (width + 2)) + "+"
-    if title != None:
-        hdr = ("+--[ %s ]--" % title) + ("-" * (width - 6 - len(title))) + "+"
+    ftr = "+" + ("-" * (width + 2)) + "+\n"
+    if title is not None:
+        hdr = ("+--[ %s ]--" % title) + ("-" * (width - 6 - len(title))) + "+\n"
     else:
         hdr = ftr
-    fmt = "| %%-%is |" % width
-    out.append(hdr)
-    for line in msg.splitlines():
-        out.append(fmt % line)
-    out.append(ftr)
-    return '\n'.join(out)
+    f.write(hdr)
+    f.writelines(map(("| {:<%i} |\n" % width).format, msg))
+    f.write(ftr)
+
+def asciibox(msg, title=None, minwidth=None):
+    """
+    Returns message string *msg* wrapped in a plain ASCII box.
+    If *minwidth* is given, pad the lines to at least *minwidth* characters.
+    If *title* is given, add *title* in the top horizontal bar.
+
+    >>> print(asciibox('foo\\nbarbaz', title='x'))
+    +--[ x ]--+
+    | foo     |
+    | barbaz  |
+    +---------+
+    """
+    f = io.StringIO()
+    asciibox_write(f, msg, title=title, minwidth=minwidth)
+    return f.getvalue()[:-1]
 
+def asciitable_write(f, rows, header=None, widths=None):
+    """
+    Write *rows*, an iterable of sequences of cells, as a plain ASCII table
+    to file object *f*.  Cells are converted using `str`.  All rows and the
+    header must have the same number of cells.
+    If *header* is given, add it as a separate header row.
+    If *widths* is given, use it as the list of column widths and stream
+    *rows* to *f* in a single pass instead of measuring them first; longer
+    cells are written as they are.
+    If neither *widths*, *header* nor any rows are given, nothing is written.
+    """
+    if widths is None:
+        if iter(rows) is rows:
+            rows = [tuple(map(str, row)) for row in rows]
+        if header is not None:
+            widths = [len(str(cell)) for cell in header]
+        for row in rows:
+            lens = [len(str(cell)) for cell in row]
+            if widths is None:
+                widths = lens
+            else:
+                _checkrow(row, widths)
+                widths = list(map(max, widths, lens))
+        if widths is None:
+            return
+    sep = "+" + "+".join("-" * (w + 2) for w in widths) + "+\n"
+    fmt = ("| " + " | ".join("{!s:<%i}" % w for w in widths) + " |\n").format
+    f.write(sep)
+    if header is not None:
+        _checkrow(header, widths)
+        f.write(fmt(*header))
+        f.write(sep)
+    for row in rows:
+        _checkrow(row, widths)
+        f.write(fmt(*row))
+    f.write(sep)
+
+def _checkrow(row, widths):
+    """
+    Raise ValueError unless *row* has as many cells as there are *widths*.
+    """
+    if len(row) != len(widths):
+        raise ValueError('row has %i cells instead of %i' %
+                         (len(row), len(widths)))
+
+def asciitable(rows, header=None, widths=None):
+    """
+    Returns *rows*, an iterable of sequences of cells, as a plain ASCII table.
+    If *header* is given, add it as a separate header row.
+    If *widths* is given, use it as the list of column widths.
+
+    >>> print(asciitable([(1, 'foo'), (23, None)], header=('n', 'name')))
+    +----+------+
+    | n  | name |
+    +----+------+
+    | 1  | foo  |
+    | 23 | None |
+    +----+------+
+    >>> asciitable([(1, 2), (3,)])
+    Traceback (most recent call last):
+        ...
+    ValueError: row has 1 cells instead of 2
+    >>> asciitable([])
+    ''
+    """
+    f = io.StringIO()
+    asciitable_write(f, rows, header=header, widths=widths)
+    return f.getvalue()[:-1]
+
+
+if __name__ == '__main__':
+    import doctest, sys
+    fails, tests = doctest.testmod(optionflags=doctest.IGNORE_EXCEPTION_DETAIL)
+    if fails > 0:
+        sys.exit(1)
+    else:
+        sys.exit(0)
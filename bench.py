@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+# vim: set list et ts=8 sts=4 sw=4 ft=python:
+
+# haklib.bench - benchmarks for haklib hot paths
+# Copyright (C) 2019, Daniel Roethlisberger <daniel@roe.ch>
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions, and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE AUTHOR ``AS IS'' AND ANY EXPRESS OR
+# IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT
+# NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Usage:
+#
+# python -m haklib.bench [-o results.json] [-c baseline.json] [-q]
+#
+# Runs all benchmarks on deterministically generated inputs of several sizes
+# and prints the best time per call.  With -o, results are written as JSON.
+# With -c, results are compared against a baseline written by an earlier
+# run with -o, and the exit status is 1 if any benchmark got slower by more
+# than the threshold.
+
+import argparse
+import array
+import collections
+import json
+import platform
+import random
+import sys
+import timeit
+
+from . import ascii
+from . import c
+from . import cpdict
+from . import dt
+from . import hexdump
+from . import iter
+from . import xor
+
+SEED = 0x6861 # 'ha'
+SIZES = [1024, 16384, 262144]
+KEY = b'haklib-bench!'
+WORDS = (b'the quick brown fox jumps over lazy dog lorem ipsum dolor sit '
+         b'amet consectetur adipiscing elit sed do eiusmod tempor').split()
+
+def _bytes(n):
+    return random.Random(SEED).getrandbits(8 * n).to_bytes(n, 'little')
+
+def _ints(n, bits=32):
+    rnd = random.Random(SEED)
+    return [rnd.getrandbits(bits) for _ in range(n)]
+
+def _plaintext(n):
+    rnd = random.Random(SEED)
+    buf = bytearray()
+    while len(buf) < n:
+        buf += rnd.choice(WORDS) + rnd.choice([b' ', b' ', b', ', b'.\n'])
+    return bytes(buf[:n])
+
+def _ciphertext(n):
+    return xor.xorcrypt(_plaintext(n), KEY)
+
+def _stamps(n):
+    rnd = random.Random(SEED)
+    zones = ['UTC', 'Z', 'CET', '+0100', '-0530']
+    return ['%04i-%02i-%02i %02i:%02i:%02i %s' % (
+                rnd.randint(1970, 2037), rnd.randint(1, 12),
+                rnd.randint(1, 28), rnd.randint(0, 23), rnd.randint(0, 59),
+                rnd.randint(0, 59), rnd.choice(zones)) for _ in range(n)]
+
+def _keys(n):
+    rnd = random.Random(SEED)
+    return [''.join(rnd.choice('aAbBcCdDeEfF') for _ in range(12))
+            for _ in range(n)]
+
+def _consume(it):
+    collections.deque(it, maxlen=0)
+
+# Benchmarks as (name, sizes, setup) tuples.  setup(size) generates the
+# input of the given size and returns the callable to time.
+
+def _bench_xorcrypt(n):
+    buf = _bytes(n)
+    return lambda: xor.xorcrypt(buf, KEY)
+
+def _bench_keylen_ioc(n):
+    buf = _ciphertext(n)
+    # default limit stops at shift 1 on this input; scan 52 shifts instead
+    return lambda: xor.keylen_ioc(buf, limit=0.05)
+
+def _bench_xorattack_kpt(n):
+    buf = _ciphertext(n)
+    kpts = [_plaintext(32), b'not in plaintext at all']
+    return lambda: _consume(xor.xorattack_kpt(buf, kpts, keylen=len(KEY)))
+
+def _bench_hexdumpify_ex(n):
+    buf = _bytes(n)
+    return lambda: hexdump.hexdumpify_ex(buf)
+
+def _bench_fromiso8601(n):
+    stamps = _stamps(n)
+    return lambda: _consume(map(dt.fromiso8601, stamps))
+
+def _bench_toiso8601(n):
+    rnd = random.Random(SEED)
+    epochs = array.array('q', [1452067324])
+    for _ in range(n - 1):
+        epochs.append(epochs[-1] + rnd.randint(0, 5))
+    fmt = dt.ISO8601Formatter('CET')
+    return lambda: _consume(fmt.map(epochs))
+
+def _bench_cpdict_set(n):
+    keys = _keys(n)
+    def run():
+        d = cpdict.CasePreservingDict()
+        for k in keys:
+            d[k] = k
+    return run
+
+def _bench_cpdict_get(n):
+    keys = _keys(n)
+    d = cpdict.CasePreservingDict((k, k) for k in keys)
+    keys = [k.swapcase() for k in keys]
+    return lambda: _consume(map(d.__getitem__, keys))
+
+def _bench_chunkwise(n):
+    data = _bytes(n)
+    return lambda: _consume(iter.chunkwise(data, 4))
+
+def _bench_unary(func, *args):
+    def setup(n):
+        ints = _ints(n)
+        return lambda: _consume(func(i, *args) for i in ints)
+    return setup
+
+def _bench_binary(func):
+    def setup(n):
+        a, b = _ints(n), _ints(n)[::-1]
+        return lambda: _consume(map(func, a, b))
+    return setup
+
+def _bench_c_sum32(n):
+    ints = _ints(n)
+    args = list(zip(ints, ints[1:], ints[2:]))
+    return lambda: _consume(c.c_sum32(*a) for a in args)
+
+def _bench_c_div(n):
+    a = _ints(n, 64)
+    b = [i | 1 for i in _ints(n)[::-1]]
+    return lambda: _consume(map(c.c_div, a, b))
+
+def _bench_vector(func, *args):
+    def setup(n):
+        a = array.array('I', _ints(n))
+        return lambda: func(a, *args)
+    return setup
+
+# Scalar helper looped over the same input as the corresponding bulk
+# version, for comparing c_vadd and c_vrot against the naive approach.
+def _bench_scalarloop(func, *args):
+    def setup(n):
+        a = array.array('I', _ints(n))
+        return lambda: array.array('I', [func(x, *args) for x in a])
+    return setup
+
+BENCHMARKS = [
+    ('xorcrypt',        SIZES,          _bench_xorcrypt),
+    ('keylen_ioc',      SIZES,          _bench_keylen_ioc),
+    ('xorattack_kpt',   SIZES,          _bench_xorattack_kpt),
+    ('hexdumpify_ex',   SIZES,          _bench_hexdumpify_ex),
+    ('fromiso8601',     [100, 1000],    _bench_fromiso8601),
+    ('toiso8601',       SIZES[:2],      _bench_toiso8601),
+    ('cpdict_set',      SIZES[:2],      _bench_cpdict_set),
+    ('cpdict_get',      SIZES[:2],      _bench_cpdict_get),
+    ('chunkwise',       SIZES,          _bench_chunkwise),
+    ('c_add32',         SIZES[:2],      _bench_binary(c.c_add32)),
+    ('c_rot32',         SIZES[:2],      _bench_unary(c.c_rot32, 13)),
+    ('c_sum32',         SIZES[:2],      _bench_c_sum32),
+    ('c_schar',         SIZES[:2],      _bench_unary(c.c_schar)),
+    ('c_uchar',         SIZES[:2],      _bench_unary(c.c_uchar)),
+    ('c_div',           SIZES[:2],      _bench_c_div),
+    ('c_mod',           SIZES[:2],      _bench_binary(c.c_mod)),
+    ('c_vadd',          SIZES,          _bench_vector(c.c_vadd, 0x9e3779b9)),
+    ('c_add32_loop',    SIZES,          _bench_scalarloop(c.c_add32,
+                                                          0x9e3779b9)),
+    ('c_vrot',          SIZES,          _bench_vector(c.c_vrot, 13)),
+    ('c_rot32_loop',    SIZES,          _bench_scalarloop(c.c_rot32, 13)),
+]
+
+def _unknown(names):
+    """
+    Return the sorted list of names in *names* that are not in BENCHMARKS.
+    """
+    return sorted(set(names or ()) - set(name for name, _, _ in BENCHMARKS))
+
+def run(names=None, quick=False, repeat=3, out=sys.stderr):
+    """
+    Run all benchmarks, or those with names in *names*, and return a dict
+    mapping 'name[size]' to the best time per call in seconds.  If *quick*
+    is true, only run the smallest size of each benchmark.
+    """
+    unknown = _unknown(names)
+    if unknown:
+        raise ValueError('unknown benchmarks: %s' % ', '.join(unknown))
+    results = {}
+    for name, sizes, setup in BENCHMARKS:
+        if names and name not in names:
+            continue
+        for size in sizes[:1] if quick else sizes:
+            timer = timeit.Timer(setup(size))
+            number, _ = timer.autorange()
+            best = min(timer.repeat(repeat=repeat, number=number)) / number
+            key = '%s[%i]' % (name, size)
+            results[key] = best
+            if out is not None:
+                out.write('%-24s %14.9f s\n' % (key, best))
+    return results
+
+def compare(baseline, results, threshold=0.1):
+    """
+    Compare *results* against *baseline* and return the list of
+    (key, baseline, result, ratio, status) rows.  Status is 'REGRESSION' if
+    the result is slower than the baseline by more than *threshold*, given
+    as a fraction, 'new' for keys missing from the baseline, 'missing' for
+    baseline keys of the benchmarks in *results* that were not measured,
+    'zero baseline' if the baseline is not usable, and '' otherwise.
+    Baseline, result and ratio are None where not available.
+    """
+    rows = []
+    for key, result in results.items():
+        if key not in baseline:
+            rows.append((key, None, result, None, 'new'))
+        elif baseline[key] <= 0:
+            rows.append((key, baseline[key], result, None, 'zero baseline'))
+        else:
+            ratio = result / baseline[key]
+            rows.append((key, baseline[key], result, ratio,
+                         'REGRESSION' if ratio > 1 + threshold else ''))
+    names = set(key.split('[')[0] for key in results)
+    for key in sorted(baseline):
+        if key not in results and key.split('[')[0] in names:
+            rows.append((key, baseline[key], None, None, 'missing'))
+    return rows
+
+def _fmt(value, fmt):
+    return '-' if value is None else fmt % value
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog='python -m haklib.bench')
+    parser.add_argument('names', nargs='*', metavar='name',
+                        help='benchmarks to run, default all')
+    parser.add_argument('-o', '--output', metavar='FILE',
+                        help='write results as JSON to FILE')
+    parser.add_argument('-c', '--compare', metavar='FILE',
+                        help='compare results against JSON baseline FILE')
+    parser.add_argument('-t', '--threshold', type=float, default=0.1,
+                        help='regression threshold as fraction, '
+                             'default %(default)s')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='timing repetitions, default %(default)s')
+    parser.add_argument('-q', '--quick', action='store_true',
+                        help='only run the smallest input size')
+    args = parser.parse_args(argv)
+    unknown = _unknown(args.names)
+    if unknown:
+        parser.error('unknown benchmarks: %s; choose from %s' % (
+                     ', '.join(unknown),
+                     ', '.join(name for name, _, _ in BENCHMARKS)))
+
+    results = run(args.names, args.quick, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'implementation': platform.python_implementation(),
+                'machine': platform.machine(),
+                'seed': SEED,
+                'results': results,
+            }, f, indent=2, sort_keys=True)
+            f.write('\n')
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        rows = compare(baseline, results, args.threshold)
+        ascii.asciitable_write(sys.stdout, (
+                (key, _fmt(base, '%.9f'), _fmt(result, '%.9f'),
+                 _fmt(ratio, '%.2f'), status)
+                for key, base, result, ratio, status in rows),
+                header=('benchmark', 'baseline', 'result', 'ratio', ''))
+        if any(row[4] == 'REGRESSION' for row in rows):
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -24,21 +24,41 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
 # THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
-import math
+import array
+import operator
+import struct
+import sys
 
 def c_div(q, d):
     """
-    Arbitrary signed integer division with c behaviour.
+    Arbitrary signed integer division with c behaviour, truncating towards
+    zero.  Exact for operands of any size.
 
     >>> (c_div(10, 3), c_div(-10, -3), c_div(-10, 3), c_div(10, -3))
     (3, 3, -3, -3)
+    >>> c_div(2**53 + 1, 1)
+    9007199254740993
     >>> c_div(-11, 0)
     Traceback (most recent call last):
         ...
     ZeroDivisionError
     """
-    s = int(math.copysign(1, q) * math.copysign(1, d))
-    return s * int(abs(q) / abs(d))
+    r = abs(q) // abs(d)
+    if (q < 0) != (d < 0):
+        return -r
+    return r
+
+def c_mod(q, d):
+    """
+    Arbitrary signed integer remainder with c behaviour, having the sign of
+    the dividend *q*, such that `c_div(q, d) * d + c_mod(q, d) == q`.
+
+    >>> (c_mod(10, 3), c_mod(-10, -3), c_mod(-10, 3), c_mod(10, -3))
+    (1, -1, -1, 1)
+    >>> c_mod(2**64 + 1, 2**53)
+    1
+    """
+    return q - c_div(q, d) * d
 
 def c_schar(i):
     """
@@ -96,6 +116,442 @@ def c_sum32(*args):
     return sum(args) & 0xFFFFFFFF
 
 
+# Bulk versions of the above, operating element-wise on all elements of
+# array.array or memoryview objects of integer type, or on NumPy integer
+# arrays.  The c type and thereby the bit width and signedness of the
+# operation is taken from the type of the first operand.  Results wrap the
+# way they would in c and are returned as a new array.array (for array.array
+# and memoryview operands) or NumPy array (for NumPy operands).
+
+def _ctype(a):
+    """
+    Return typecode, bit width and signedness of array-like *a*.
+    """
+    if hasattr(a, 'dtype'):
+        return a.dtype.char, a.dtype.itemsize * 8, a.dtype.kind == 'i'
+    if isinstance(a, array.array):
+        typecode = a.typecode
+    else:
+        typecode = a.format.lstrip('@=<>!')
+    return typecode, a.itemsize * 8, typecode.islower()
+
+def _cwrap(typecode, bits, signed, values):
+    """
+    Return a new array.array of *typecode* holding *values* truncated to
+    *bits* bits as if casted in c.
+    """
+    mask = (1 << bits) - 1
+    if signed:
+        half = 1 << (bits - 1)
+        return array.array(typecode, [((x + half) & mask) - half
+                                      for x in values])
+    return array.array(typecode, [x & mask for x in values])
+
+def _cwrapint(i, bits, signed):
+    """
+    Truncate integer *i* to *bits* bits as if casted in c.
+    """
+    mask = (1 << bits) - 1
+    if signed:
+        half = 1 << (bits - 1)
+        return ((i + half) & mask) - half
+    return i & mask
+
+def _cbinargs(a, b):
+    """
+    Return typecode, bit width, signedness, mask and sign bit of *a*, and
+    *b* prepared for element-wise operation with *a*.  Integer *b*,
+    including NumPy integer scalars, is returned as an int, or as a NumPy
+    scalar of the type of *a* for NumPy *a*.  Sequence *b* is returned as a
+    NumPy array of the type of *a* for NumPy *a*, or as a list of ints if
+    *b* is a NumPy array and *a* is not.
+    """
+    typecode, bits, signed = _ctype(a)
+    try:
+        b = operator.index(b)
+    except TypeError:
+        pass
+    else:
+        if hasattr(a, 'dtype'):
+            b = a.dtype.type(_cwrapint(b, bits, signed))
+        return typecode, bits, signed, (1 << bits) - 1, 1 << (bits - 1), b
+    if not hasattr(b, '__len__'):
+        raise TypeError('operand must be an integer or a sequence, not %s' %
+                        type(b).__name__)
+    if len(a) != len(b):
+        raise ValueError('operands have different lengths %i and %i' %
+                         (len(a), len(b)))
+    if hasattr(a, 'dtype'):
+        if hasattr(b, 'dtype'):
+            b = b.astype(a.dtype)
+        else:
+            values = a.copy()
+            values[:] = [_cwrapint(y, bits, signed) for y in b]
+            b = values
+    elif hasattr(b, 'dtype'):
+        b = b.tolist()
+    return typecode, bits, signed, (1 << bits) - 1, 1 << (bits - 1), b
+
+# Each operation below is specialised into a single list comprehension per
+# operand kind and signedness, as this is what makes the bulk versions
+# faster than looping over the scalar helpers.
+
+def c_vadd(a, b):
+    """
+    Add *b* to all elements of *a* within the value range of the type of *a*.
+    *b* is either an integer or an array of the same length as *a*.
+
+    >>> c_vadd(array.array('I', [0xFFFFFFFF, 1]), 1)
+    array('I', [0, 2])
+    >>> c_vadd(array.array('b', [127, -128]), array.array('b', [1, -1]))
+    array('b', [-128, 127])
+    >>> c_vadd(array.array('I', [1, 2, 3]), array.array('I', [1]))
+    Traceback (most recent call last):
+        ...
+    ValueError: operands have different lengths 3 and 1
+    """
+    typecode, bits, signed, mask, half, b = _cbinargs(a, b)
+    if hasattr(a, 'dtype'):
+        return a + b
+    if isinstance(b, int):
+        if signed:
+            b += half
+            return array.array(typecode, [((x + b) & mask) - half
+                                          for x in a])
+        return array.array(typecode, [(x + b) & mask for x in a])
+    if signed:
+        return array.array(typecode, [((x + y + half) & mask) - half
+                                      for x, y in zip(a, b)])
+    return array.array(typecode, [(x + y) & mask for x, y in zip(a, b)])
+
+def c_vsub(a, b):
+    """
+    Subtract *b* from all elements of *a* within the value range of the type
+    of *a*.  *b* is either an integer or an array of the same length as *a*.
+
+    >>> c_vsub(array.array('B', [0, 1, 255]), 1)
+    array('B', [255, 0, 254])
+    >>> c_vsub(array.array('b', [-128, 0]), array.array('b', [1, -128]))
+    array('b', [127, -128])
+    """
+    typecode, bits, signed, mask, half, b = _cbinargs(a, b)
+    if hasattr(a, 'dtype'):
+        return a - b
+    if isinstance(b, int):
+        if signed:
+            b -= half
+            return array.array(typecode, [((x - b) & mask) - half
+                                          for x in a])
+        return array.array(typecode, [(x - b) & mask for x in a])
+    if signed:
+        return array.array(typecode, [((x - y + half) & mask) - half
+                                      for x, y in zip(a, b)])
+    return array.array(typecode, [(x - y) & mask for x, y in zip(a, b)])
+
+def c_vmul(a, b):
+    """
+    Multiply all elements of *a* by *b* within the value range of the type of
+    *a*.  *b* is either an integer or an array of the same length as *a*.
+
+    >>> c_vmul(array.array('I', [0x10000, 3]), 0x10001)
+    array('I', [65536, 196611])
+    >>> c_vmul(array.array('h', [0x4000]), 2)
+    array('h', [-32768])
+    """
+    typecode, bits, signed, mask, half, b = _cbinargs(a, b)
+    if hasattr(a, 'dtype'):
+        return a * b
+    if isinstance(b, int):
+        if signed:
+            return array.array(typecode, [((x * b + half) & mask) - half
+                                          for x in a])
+        return array.array(typecode, [(x * b) & mask for x in a])
+    if signed:
+        return array.array(typecode, [((x * y + half) & mask) - half
+                                      for x, y in zip(a, b)])
+    return array.array(typecode, [(x * y) & mask for x, y in zip(a, b)])
+
+def c_vrot(a, n):
+    """
+    Rotate all elements of *a* left by *n* bits within the bit width of the
+    type of *a*; negative *n* rotates right.
+
+    >>> c_vrot(array.array('I', [0xF0000000, 0x12345678]), 4)
+    array('I', [15, 591751041])
+    >>> c_vrot(array.array('B', [0xF0]), -4)
+    array('B', [15])
+    >>> c_vrot(array.array('b', [-16, 1]), 4)
+    array('b', [15, 16])
+    """
+    typecode, bits, signed = _ctype(a)
+    n %= bits
+    if hasattr(a, 'dtype'):
+        if n == 0:
+            return a.copy()
+        u = a.view('u%i' % (bits // 8))
+        return ((u << n) | (u >> (bits - n))).view(a.dtype)
+    if n == 0:
+        return array.array(typecode, a)
+    r = bits - n
+    mask = (1 << bits) - 1
+    if signed:
+        half = 1 << (bits - 1)
+        return array.array(typecode, [(((u << n) + (u >> r) + half) & mask)
+                                      - half
+                                      for x in a for u in [x & mask]])
+    return array.array(typecode, [((x << n) & mask) | (x >> r) for x in a])
+
+def c_vshl(a, n):
+    """
+    Shift all elements of *a* left by *n* bits within the value range of the
+    type of *a*.  *n* must be smaller than the bit width of the type.
+
+    >>> c_vshl(array.array('B', [0x81, 0x01]), 1)
+    array('B', [2, 2])
+    >>> c_vshl(array.array('b', [0x41, -1]), 1)
+    array('b', [-126, -2])
+    >>> c_vshl(array.array('B', [1]), 8)
+    Traceback (most recent call last):
+        ...
+    ValueError: shift count 8 out of range for 8 bits
+    """
+    typecode, bits, signed = _ctype(a)
+    if not 0 <= n < bits:
+        raise ValueError('shift count %i out of range for %i bits' %
+                         (n, bits))
+    if hasattr(a, 'dtype'):
+        return a << n
+    mask = (1 << bits) - 1
+    if signed:
+        half = 1 << (bits - 1)
+        return array.array(typecode, [(((x << n) + half) & mask) - half
+                                      for x in a])
+    return array.array(typecode, [(x << n) & mask for x in a])
+
+def c_vshr(a, n):
+    """
+    Shift all elements of *a* right by *n* bits; arithmetic shift for signed
+    types, logical shift for unsigned types.  *n* must be smaller than the bit
+    width of the type.
+
+    >>> c_vshr(array.array('b', [-128, 64]), 1)
+    array('b', [-64, 32])
+    >>> c_vshr(array.array('B', [0x80, 0x40]), 1)
+    array('B', [64, 32])
+    """
+    typecode, bits, signed = _ctype(a)
+    if not 0 <= n < bits:
+        raise ValueError('shift count %i out of range for %i bits' %
+                         (n, bits))
+    if hasattr(a, 'dtype'):
+        return a >> n
+    return array.array(typecode, [x >> n for x in a])
+
+def c_vcast(a, typecode):
+    """
+    Convert all elements of *a* to the c type given by array/struct
+    *typecode* as if casted in c.
+
+    >>> c_vcast(array.array('I', [0x12345678, 0xFFFFFFFF]), 'B')
+    array('B', [120, 255])
+    >>> c_vcast(array.array('B', [0x7F, 0x80]), 'b')
+    array('b', [127, -128])
+    >>> c_vcast(memoryview(b'\\xff\\x01'), 'b')
+    array('b', [-1, 1])
+    """
+    if hasattr(a, 'dtype'):
+        return a.astype(typecode)
+    bits = array.array(typecode).itemsize * 8
+    return _cwrap(typecode, bits, typecode.islower(), a)
+
+
+
+# Declarative c struct records over buffers.  Field types are struct module
+# format characters, which map to c types, or the equivalent stdint names.
+
+_STDINT = {
+    'int8_t':   'b',
+    'uint8_t':  'B',
+    'int16_t':  'h',
+    'uint16_t': 'H',
+    'int32_t':  'i',
+    'uint32_t': 'I',
+    'int64_t':  'q',
+    'uint64_t': 'Q',
+    'float':    'f',
+    'double':   'd',
+}
+
+def _arraytypecode(fmt, size):
+    """
+    Return the array.array typecode matching single-value struct format
+    *fmt* of *size* bytes, or None if there is none.
+    """
+    if len(fmt) != 1 or fmt not in 'bBhHiIlLqQnNfd':
+        return None
+    if fmt in 'fd':
+        return fmt
+    signed = fmt.islower()
+    for typecode in 'bBhHiIlLqQ':
+        if typecode.islower() == signed and \
+                array.array(typecode).itemsize == size:
+            return typecode
+    return None
+
+class CStructView(object):
+    """
+    Lazy view of a single c struct record within a buffer.  Fields are
+    unpacked from the underlying buffer on each attribute access.
+    """
+    __slots__ = ('_buf', '_offset')
+
+    def __init__(self, buf, offset=0):
+        self._buf = buf
+        self._offset = offset
+
+    def astuple(self):
+        return self._cstruct.struct.unpack_from(self._buf, self._offset)
+
+    def asdict(self):
+        return dict((name, getattr(self, name))
+                    for name in self._cstruct.names)
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, ', '.join(
+                '%s=%r' % (name, getattr(self, name))
+                for name in self._cstruct.names))
+
+class CStructArray(object):
+    """
+    Array of *count* consecutive c struct records of type *cstruct* starting
+    at *offset* within *buf*.  Indexing returns lazy views, iterating yields
+    tuples as returned by `struct.iter_unpack`.
+    """
+    def __init__(self, cstruct, buf, offset=0, count=None):
+        buf = memoryview(buf).cast('B')
+        if count is None:
+            count = (len(buf) - offset) // cstruct.size
+        if offset < 0 or count < 0 or \
+                offset + count * cstruct.size > len(buf):
+            raise ValueError('%i records of %i bytes at offset %i exceed '
+                             'buffer of %i bytes' % (count, cstruct.size,
+                                                     offset, len(buf)))
+        self.cstruct = cstruct
+        self._buf = buf[offset:offset + count * cstruct.size]
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        return self.cstruct.view(self._buf, i * self.cstruct.size)
+
+    def __iter__(self):
+        return self.cstruct.struct.iter_unpack(self._buf)
+
+    def column(self, name):
+        """
+        Return all values of field *name* as an array.array for numeric
+        fields, or as a list otherwise.
+        """
+        cs = self.cstruct
+        fmt, size, offset, start, stop = cs._fields[name]
+        typecode = _arraytypecode(fmt, size)
+        if typecode is None:
+            if stop - start == 1:
+                return [rec[start] for rec in self]
+            return [rec[start:stop] for rec in self]
+        col = bytearray(self._count * size)
+        for k in range(size):
+            col[k::size] = self._buf[offset + k::cs.size]
+        col = array.array(typecode, col)
+        if cs.byteorder in '<>!' and \
+                (cs.byteorder == '<') != (sys.byteorder == 'little'):
+            col.byteswap()
+        return col
+
+class CStruct(object):
+    """
+    Declarative c struct record type, given a list of (name, type) *fields*
+    and a struct module *byteorder* character.  Types are struct format
+    strings such as 'I' or '16s', or stdint names such as 'uint32_t'.
+    Like the struct module, native alignment with byteorder '@' does not add
+    trailing padding; add an explicit 'x' pad field where needed.
+
+    >>> hdr = CStruct([('magic', 'uint32_t'), ('flags', 'H'), ('len', 'H')])
+    >>> buf = hdr.pack(0xfeedface, 1, 16) + hdr.pack(0xcafebabe, 2, 32)
+    >>> rec = hdr.view(buf, hdr.size)
+    >>> (hex(rec.magic), rec.len)
+    ('0xcafebabe', 32)
+    >>> recs = hdr.array(buf)
+    >>> (len(recs), recs[0].flags, list(recs)[1])
+    (2, 1, (3405691582, 2, 32))
+    >>> recs.column('len')
+    array('H', [16, 32])
+    >>> hdr.array(buf, count=5)
+    Traceback (most recent call last):
+        ...
+    ValueError: 5 records of 8 bytes at offset 0 exceed buffer of 16 bytes
+    >>> native = CStruct([('x', 'H')], byteorder='')
+    >>> native.array(native.pack(1) + native.pack(2)).column('x')
+    array('H', [1, 2])
+    """
+    def __init__(self, fields, byteorder='<'):
+        # struct treats an empty byteorder as native '@'
+        byteorder = byteorder or '@'
+        self.byteorder = byteorder
+        self.names = tuple(name for name, _ in fields)
+        self._fields = {}
+        fmt = ''
+        nvalues = 0
+        props = {'__slots__': (), '_cstruct': self}
+        for name, ctype in fields:
+            ctype = _STDINT.get(ctype, ctype)
+            size = struct.calcsize(byteorder + ctype)
+            offset = struct.calcsize(byteorder + fmt + ctype) - size
+            fmt += ctype
+            st = struct.Struct(byteorder + ctype)
+            start = nvalues
+            nvalues += len(st.unpack(bytes(size)))
+            self._fields[name] = (ctype, size, offset, start, nvalues)
+            props[name] = self._property(st, offset, nvalues - start)
+        self.struct = struct.Struct(byteorder + fmt)
+        self.size = self.struct.size
+        self.View = type('CStructView', (CStructView,), props)
+
+    @staticmethod
+    def _property(st, offset, nvalues):
+        unpack_from = st.unpack_from
+        if nvalues == 1:
+            return property(lambda self:
+                            unpack_from(self._buf, self._offset + offset)[0])
+        return property(lambda self:
+                        unpack_from(self._buf, self._offset + offset))
+
+    def pack(self, *values):
+        return self.struct.pack(*values)
+
+    def unpack(self, buf, offset=0):
+        return self.struct.unpack_from(buf, offset)
+
+    def view(self, buf, offset=0):
+        """
+        Return a lazy view of the record at *offset* in *buf*.
+        """
+        return self.View(buf, offset)
+
+    def array(self, buf, offset=0, count=None):
+        """
+        Return a CStructArray of *count* records at *offset* in *buf*,
+        defaulting to as many records as fit into *buf*.
+        """
+        return CStructArray(self, buf, offset, count)
+
+
 
 if __name__ == '__main__':
     import doctest, sys
@@ -32,8 +32,9 @@
 # print(x['AaA'])
 
 import collections
+import collections.abc
 
-class CasePreservingDict(collections.MutableMapping):
+class CasePreservingDict(collections.abc.MutableMapping):
     """
     Ordered, case-preserving and case-insensitive dict.
     Casing of first write is preserved.
@@ -69,7 +70,7 @@ class CasePreservingDict(collections.MutableMapping):
     def __eq__(self, other):
         if isinstance(other, CasePreservingDict):
             pass
-        elif isinstance(other, collections.Mapping):
+        elif isinstance(other, collections.abc.Mapping):
             other = CasePreservingDict(other)
         else:
             return NotImplemented
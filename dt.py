@@ -67,7 +67,7 @@ def tzs2td(tzs):
         sign = 1
     h = int(tzs[1:3])
     m = int(tzs[3:5])
-    return datetime.timedelta(minutes=(sign*h*60+m))
+    return datetime.timedelta(minutes=(sign*(h*60+m)))
 
 def fromiso8601(timestamp):
     """
@@ -86,6 +86,75 @@ def fromepoch(epoch):
     """
     return datetime.datetime.fromtimestamp(epoch, UTC())
 
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+class ISO8601Formatter(object):
+    """
+    Formats UNIX epoch seconds as ISO 8601 timestamps in the fixed timezone
+    *tz*, given as name from the TZm dict or in +/-XXXX format.  Timezone 'Z'
+    results in a 'Z' suffix, all others in a +/-XX:XX suffix.  *sep*
+    separates date and time.  Fractional seconds are ignored.
+    The formatted date and hour prefix is cached, so that only the minutes
+    and seconds are rendered for consecutive timestamps within the same hour,
+    which makes formatting time-ordered data fast.
+    """
+    def __init__(self, tz='UTC', sep='T'):
+        self.offset = int(tzs2td(tz).total_seconds())
+        if tz == 'Z':
+            suffix = 'Z'
+        else:
+            suffix = '%s%02i:%02i' % ('-' if self.offset < 0 else '+',
+                                      abs(self.offset) // 3600,
+                                      abs(self.offset) // 60 % 60)
+        self.sep = sep
+        self._minutes = ['%02i:' % i for i in range(60)]
+        self._seconds = ['%02i%s' % (i, suffix) for i in range(60)]
+        self._cache = (None, None)
+
+    def format(self, epoch):
+        """
+        Return UNIX epoch *epoch* as ISO 8601 timestamp string.
+        """
+        t = int(epoch // 1) + self.offset
+        hour, secs = divmod(t, 3600)
+        # read and replace hour and prefix as one tuple so that formatters
+        # shared between threads never pair a prefix with the wrong hour
+        cachedhour, prefix = self._cache
+        if hour != cachedhour:
+            dt = _EPOCH + datetime.timedelta(hours=hour)
+            prefix = '%04i-%02i-%02i%s%02i:' % (
+                    dt.year, dt.month, dt.day, self.sep, dt.hour)
+            self._cache = (hour, prefix)
+        return prefix + self._minutes[secs // 60] + self._seconds[secs % 60]
+
+    def map(self, epochs):
+        """
+        Return an iterator over all UNIX epochs in *epochs*, such as a list
+        or an array, formatted as ISO 8601 timestamp strings.
+        """
+        return map(self.format, epochs)
+
+    def write(self, f, epochs, end='\n'):
+        """
+        Write all UNIX epochs in *epochs* formatted as ISO 8601 timestamp
+        strings to text file object *f*, each followed by *end*.
+        """
+        fmt = self.format
+        f.writelines(fmt(epoch) + end for epoch in epochs)
+
+_formatters = {}
+
+def toiso8601(epoch, tz='UTC', sep='T'):
+    """
+    Format UNIX epoch as ISO 8601 timestamp string in fixed timezone *tz*.
+    Uses a cached ISO8601Formatter per *tz* and *sep*.
+    """
+    try:
+        fmt = _formatters[tz, sep]
+    except KeyError:
+        fmt = _formatters[tz, sep] = ISO8601Formatter(tz, sep).format
+    return fmt(epoch)
+
 def utcnow():
     """
     Create TZ aware now
@@ -184,6 +253,16 @@ if __name__ == '__main__':
     _test(fromiso8601('2016-01-06 10:02:04 CEST'))
     _test(fromiso8601('2016-01-06 09:02:04.123 CET'))
     _test(fromepoch(1452067324))
+    _test(toiso8601(1452067324, sep=' '))
+    def _testeq(s, refstr):
+        if not s == refstr:
+            print("%s != %s" % (s, refstr))
+        print(s)
+    _testeq(toiso8601(1452067324, tz='CET'), '2016-01-06T09:02:04+01:00')
+    _testeq(toiso8601(1452067324.9, tz='-0530'), '2016-01-06T02:32:04-05:30')
+    _testeq(toiso8601(1452067324, tz='Z'), '2016-01-06T08:02:04Z')
+    _testeq(toiso8601(-1, tz='+0100'), '1970-01-01T00:59:59+01:00')
+    _test(fromiso8601('2016-01-06 02:32:04 -0530'))
     print(ago(fromiso8601('2016-01-06 09:02:04.123 CET')))
     print(ago(fromiso8601('2015-01-06 09:02:04.123 CET')))
     print(ago(fromiso8601('1253-01-06 09:02:04.123 CET')))
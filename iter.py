@@ -25,7 +25,9 @@
 # THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 
-from itertools import zip_longest
+import collections
+import os
+from itertools import islice, zip_longest
 
 
 def pairwise(iterable):
@@ -55,3 +57,111 @@ def blockwise(iterable, blocksize=2, fillvalue=None):
     it = iter(iterable)
     return zip_longest(*[it]*blocksize, fillvalue=fillvalue)
 
+
+
+def _batches(iterable, batchsize):
+    """
+    Return elements in *iterable* as lists of up to *batchsize* elements.
+    Returns all elements; the last list may be shorter.
+    """
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, batchsize))
+        if not batch:
+            return
+        yield batch
+
+
+def _mapbatch(func, batch):
+    return [func(chunk) for chunk in batch]
+
+
+def chunkmap(func, iterable, chunksize=2, workers=None, processes=False,
+             ordered=True, prefetch=None, batchsize=None):
+    """
+    Return the results of *func* applied to the chunks of *iterable* as
+    returned by `chunkwise`, computed in a pool of *workers* threads, or of
+    processes if *processes* is true.  Does not process the last
+    `len(iterable) % chunksize` elements.
+    Chunks are handed to the workers in batches of *batchsize* chunks, which
+    defaults to 1 for threads and 64 for processes in order to amortize the
+    pickling overhead per chunk.  At most *prefetch* batches are in flight at
+    any time, defaulting to twice the number of workers, so that memory use
+    stays flat even on endless iterables.
+    If *ordered* is false, results are returned in order of completion
+    instead of in order of the chunks.
+    For processes, *func* must be picklable, i.e. a module-level function.
+
+    >>> list(chunkmap(sum, range(10), 3, workers=2))
+    [3, 12, 21]
+    >>> sorted(chunkmap(sum, range(10), 3, workers=2, ordered=False))
+    [3, 12, 21]
+    >>> list(chunkmap(sum, range(10), 3, workers=2, processes=True))
+    [3, 12, 21]
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if prefetch is None:
+        prefetch = 2 * workers
+    if workers < 1:
+        raise ValueError('workers must be at least 1')
+    if prefetch < 1:
+        raise ValueError('prefetch must be at least 1')
+    if batchsize is not None and batchsize < 1:
+        raise ValueError('batchsize must be at least 1')
+    return _chunkmap(func, iterable, chunksize, workers, processes,
+                     ordered, prefetch, batchsize)
+
+
+def _chunkmap(func, iterable, chunksize, workers, processes,
+              ordered, prefetch, batchsize):
+    # imported here as it is expensive and only needed by chunkmap
+    import concurrent.futures
+    if processes:
+        executor = concurrent.futures.ProcessPoolExecutor(workers)
+        if batchsize is None:
+            batchsize = 64
+    else:
+        executor = concurrent.futures.ThreadPoolExecutor(workers)
+        if batchsize is None:
+            batchsize = 1
+    batches = _batches(chunkwise(iterable, chunksize), batchsize)
+    if ordered:
+        pending = collections.deque()
+    else:
+        pending = set()
+    try:
+        for batch in batches:
+            if len(pending) >= prefetch:
+                if ordered:
+                    yield from pending.popleft().result()
+                else:
+                    done, pending = concurrent.futures.wait(pending,
+                            return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        yield from future.result()
+            future = executor.submit(_mapbatch, func, batch)
+            if ordered:
+                pending.append(future)
+            else:
+                pending.add(future)
+        if ordered:
+            while pending:
+                yield from pending.popleft().result()
+        else:
+            for future in concurrent.futures.as_completed(pending):
+                yield from future.result()
+            pending = ()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown()
+
+
+if __name__ == '__main__':
+    import doctest, sys
+    fails, tests = doctest.testmod(optionflags=doctest.IGNORE_EXCEPTION_DETAIL)
+    if fails > 0:
+        sys.exit(1)
+    else:
+        sys.exit(0)
@@ -1,7 +1,7 @@
 #!/usr/bin/env python
 # vim: set list et ts=8 sts=4 sw=4 ft=python:
 
-# haklib.pb - macOS pasteboard (clipboard) access
+# haklib.pb - pasteboard (clipboard) access for macOS, X11 and Wayland
 # Copyright (C) 2018, Daniel Roethlisberger <daniel@roe.ch>
 #
 # Redistribution and use in source and binary forms, with or without
@@ -25,25 +25,155 @@
 # THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 
+# Example use:
+#
+# import haklib.pb
+# haklib.pb.pbcopy('foo')
+# print(haklib.pb.pbpaste())
+#
+# The clipboard helper to use is detected once per process; if there is none,
+# RuntimeError is raised.  Use haklib.pb.setbackend(haklib.pb.MemoryBackend())
+# for tests and headless use.
+
+import os
+import shutil
 import subprocess
 
 
+class CommandBackend(object):
+    """
+    Clipboard access through a pair of helper commands, such as pbcopy and
+    pbpaste.  Strings are written to the copy command's stdin in chunks of
+    *chunksize* characters in order to avoid encoding large payloads in one
+    go.
+    """
+    def __init__(self, name, copycmd, pastecmd, chunksize=64*1024):
+        self.name = name
+        self.copycmd = copycmd
+        self.pastecmd = pastecmd
+        self.chunksize = chunksize
+        self.env = dict(os.environ, LANG='en_US.UTF-8')
+
+    def copy(self, s):
+        proc = subprocess.Popen(self.copycmd, env=self.env,
+                                stdin=subprocess.PIPE)
+        try:
+            for i in range(0, len(s), self.chunksize):
+                proc.stdin.write(s[i:i+self.chunksize].encode('utf-8'))
+        except BrokenPipeError:
+            # helper exited early; report its exit status below
+            pass
+        finally:
+            try:
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+            rv = proc.wait()
+        if rv != 0:
+            raise subprocess.CalledProcessError(rv, self.copycmd)
+
+    def paste(self):
+        buf = subprocess.check_output(self.pastecmd, env=self.env)
+        return buf.decode('utf-8')
+
+
+class MemoryBackend(object):
+    """
+    In-memory clipboard for tests and headless use.
+    """
+    name = 'memory'
+
+    def __init__(self, s=''):
+        self.s = s
+
+    def copy(self, s):
+        self.s = s
+
+    def paste(self):
+        return self.s
+
+
+# Known clipboard helpers in order of preference, as (name, copy command,
+# paste command, required environment variable) tuples.
+BACKENDS = [
+    ('pbcopy',  ['pbcopy'], ['pbpaste'], None),
+    ('wl-copy', ['wl-copy'], ['wl-paste', '--no-newline'], 'WAYLAND_DISPLAY'),
+    ('xclip',   ['xclip', '-selection', 'clipboard'],
+                ['xclip', '-selection', 'clipboard', '-o'], 'DISPLAY'),
+    ('xsel',    ['xsel', '--clipboard', '--input'],
+                ['xsel', '--clipboard', '--output'], 'DISPLAY'),
+]
+
+_backend = None
+
+
+def detect():
+    """
+    Return a new backend for the first available clipboard helper in
+    BACKENDS.  Helper commands are resolved to absolute paths.
+    Raises RuntimeError if there is no clipboard helper.
+    """
+    for name, copycmd, pastecmd, envvar in BACKENDS:
+        if envvar is not None and not os.environ.get(envvar):
+            continue
+        copypath = shutil.which(copycmd[0])
+        pastepath = shutil.which(pastecmd[0])
+        if copypath is None or pastepath is None:
+            continue
+        return CommandBackend(name, [copypath] + copycmd[1:],
+                                    [pastepath] + pastecmd[1:])
+    raise RuntimeError('no clipboard helper found')
+
+
+def backend():
+    """
+    Return the clipboard backend in use, detecting it on first use.
+    """
+    global _backend
+    if _backend is None:
+        _backend = detect()
+    return _backend
+
+
+def setbackend(b):
+    """
+    Set the clipboard backend to use to *b*; None redetects on next use.
+
+    >>> setbackend(MemoryBackend())
+    >>> pbcopy('foo')
+    >>> pbpaste()
+    'foo'
+    >>> saved = BACKENDS[:]
+    >>> BACKENDS[:] = [('sh', ['sh', '-c', 'cat >/dev/null'],
+    ...                       ['sh', '-c', 'printf bar'], None)]
+    >>> setbackend(None)
+    >>> (backend().name, pbpaste())
+    ('sh', 'bar')
+    >>> BACKENDS[:] = saved
+    >>> setbackend(None)
+    """
+    global _backend
+    _backend = b
+
+
 def pbcopy(s):
     """
     Copy string *s* to the pasteboard.
     """
-    proc = subprocess.Popen('pbcopy',
-                            env={'LANG': 'en_US.UTF-8'},
-                            stdin=subprocess.PIPE)
-    proc.communicate(s.encode('utf-8'))
+    backend().copy(s)
 
 
 def pbpaste():
     """
     Return the current content of the pasteboard as a string.
     """
-    buf = subprocess.check_output('pbpaste',
-                                  env={'LANG': 'en_US.UTF-8'})
-    return buf.decode('utf-8')
+    return backend().paste()
 
 
+if __name__ == '__main__':
+    import doctest, sys
+    fails, tests = doctest.testmod(optionflags=doctest.IGNORE_EXCEPTION_DETAIL)
+    if fails > 0:
+        sys.exit(1)
+    else:
+        sys.exit(0)